@@ -1,19 +1,30 @@
 from typing import Any, Dict, Optional, Union
-from fastmcp.client.client import Client
 from contextlib import asynccontextmanager
+from utils.Scheduler import Scheduler, estimate_tokens
 
 
 class MCPClient:
-    def __init__(self, config: Union[str, dict] = "http://localhost:8050/sse"):
+    def __init__(
+        self,
+        config: Union[str, dict] = "http://localhost:8050/sse",
+        scheduler: Optional[Scheduler] = None,
+        pool_size: int = 1,
+    ):
         """Initialize the MCP client.
 
         Args:
             config (Union[str, dict]): Either a URL string or a configuration dictionary.
                 If string: Treated as the URL of the MCP server.
                 If dict: Should follow the MCP configuration format with 'mcpServers' key.
+            scheduler (Scheduler, optional): Rate limits tool calls on "tool:<name>" keys.
+            pool_size (int): Number of sessions tool calls are spread over.
         """
         self.config = config
+        self.scheduler = scheduler
+        self.pool_size = max(1, pool_size)
         self._client = None
+        self._pool = []
+        self._next = 0
         self._is_connected = False
 
     async def connect(self):
@@ -21,20 +32,35 @@ class MCPClient:
         if self._is_connected:
             return
 
-        if isinstance(self.config, str):
-            # For SSE transport, we just need the URL
-            self._client = Client(self.config)
-        else:
-            # Configuration mode with multiple servers
-            self._client = Client(self.config)
+        # fastmcp is heavy to import, only pay for it once we actually connect
+        from fastmcp.client.client import Client
 
-        await self._client.__aenter__()
+        try:
+            for _ in range(self.pool_size):
+                if isinstance(self.config, str):
+                    # For SSE transport, we just need the URL
+                    client = Client(self.config)
+                else:
+                    # Configuration mode with multiple servers
+                    client = Client(self.config)
+                await client.__aenter__()
+                self._pool.append(client)
+        except Exception:
+            await self._close_pool()
+            raise
+
+        # the first session also serves tool listing
+        self._client = self._pool[0]
         self._is_connected = True
 
+    async def _close_pool(self):
+        while self._pool:
+            await self._pool.pop().__aexit__(None, None, None)
+
     async def disconnect(self):
         """Disconnect from the MCP server(s)."""
         if self._is_connected and self._client:
-            await self._client.__aexit__(None, None, None)
+            await self._close_pool()
             self._is_connected = False
             self._client = None
 
@@ -109,5 +135,12 @@ class MCPClient:
         if not self._is_connected:
             raise RuntimeError("Not connected to MCP server(s)")
 
-        result = await self._client.call_tool(tool_name, arguments, server)
+        if self.scheduler is not None:
+            await self.scheduler.acquire(
+                f"tool:{tool_name}", tokens=estimate_tokens(str(arguments))
+            )
+        # round robin over the pool so concurrent calls use different sessions
+        client = self._pool[self._next % len(self._pool)]
+        self._next += 1
+        result = await client.call_tool(tool_name, arguments, server)
         return result.content[0].text if result.content else None
@@ -1,7 +1,5 @@
-import requests
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.utilities.logging import get_logger
-from openai import OpenAI
 from dotenv import load_dotenv
 from pathlib import Path
 import os
@@ -10,7 +8,8 @@ load_dotenv(Path("../.env"))
 
 
 ARXIV_NAMESPACE = "{http://www.w3.org/2005/Atom}"
-LLM = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# upstream of get_weather, overridden by the load tests to point at a local stub
+OPEN_METEO_URL = os.getenv("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
 
 logger = get_logger(__name__)
 
@@ -18,7 +17,7 @@ logger = get_logger(__name__)
 mcp = FastMCP(
     name="Knowledge Base",
     host="0.0.0.0",  # only used for SSE transport (localhost)
-    port=8050,  # only used for SSE transport (set this to any port)
+    port=int(os.getenv("MCP_PORT", 8050)),  # only used for SSE transport
 )
 
 
@@ -35,8 +34,10 @@ def get_weather(latitude, longitude):
     Returns:
         dict: Current temperature
     """
+    import requests
+
     response = requests.get(
-        f"https://api.open-meteo.com/v1/forecast?latitude={latitude}&longitude={longitude}&current=temperature_2m,wind_speed_10m&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m"
+        f"{OPEN_METEO_URL}?latitude={latitude}&longitude={longitude}&current=temperature_2m,wind_speed_10m&hourly=temperature_2m,relative_humidity_2m,wind_speed_10m"
     )
     data = response.json()
     return data["current"]
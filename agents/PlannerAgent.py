@@ -1,5 +1,38 @@
-from utils.schemas import Plan
-from openai import OpenAI
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from typing import TYPE_CHECKING, Optional
+from utils.Scheduler import Scheduler, estimate_tokens
+from utils.prompts import REPLANNER_AGENT_PROMPT
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+    from utils.schemas import Plan, PlannerTask
+
+# rough upper bound of the tokens a plan takes, reserved up front
+PLAN_OUTPUT_TOKENS = 2000
+
+
+def canonical_tools(tools: list) -> list:
+    """Sort the tools by name and every dict by key.
+
+    The tools and developer prompt are the prefix of every planner request.
+    Keeping them byte identical between requests, whatever order the MCP server
+    lists the tools in, lets provider side prompt caching hit.
+    """
+
+    def sort_keys(value):
+        if isinstance(value, dict):
+            return {key: sort_keys(value[key]) for key in sorted(value)}
+        if isinstance(value, list):
+            return [sort_keys(item) for item in value]
+        return value
+
+    return sorted(
+        (sort_keys(tool) for tool in tools), key=lambda tool: str(tool.get("name"))
+    )
 
 
 class PlannerAgent:
@@ -10,32 +43,158 @@ class PlannerAgent:
         messages,
         tools,
         model_name: str = "gpt-4.1-mini",
+        scheduler: Optional[Scheduler] = None,
     ):
         self.model_name: str = model_name
+        self.scheduler: Optional[Scheduler] = scheduler
         self.dev_prompt: str = dev_prompt
         self.llm: OpenAI = llm
         self.messages: list[dict] = messages
-        self.tools = tools
+        self.tools = canonical_tools(tools)
+        # routes requests sharing the prefix to the same cache on the provider side
+        self.prompt_cache_key: str = hashlib.sha256(
+            (str(dev_prompt) + json.dumps(self.tools)).encode()
+        ).hexdigest()[:16]
+        if self.dev_prompt:
+            self.messages.append({"role": "developer", "content": self.dev_prompt})
+
+    def reset(self):
+        """Forget the previous requests, keeping only the developer prompt."""
+        self.messages.clear()
         if self.dev_prompt:
             self.messages.append({"role": "developer", "content": self.dev_prompt})
 
     def add_messages(self, query: str):
         self.messages.append({"role": "user", "content": query})
 
-    def plan(self, query: str):
+    def plan(self, query: str, model_name: Optional[str] = None):
         """Create a detailed plan to complete the request of the user.
 
         Args:
             query (str): The request of the user.
+            model_name (str, optional): Model to use instead of `model_name`.
 
         Returns:
             Plan: The plan to complete the request of the user.
         """
+        # pydantic is only needed once we actually ask for a plan
+        from utils.schemas import Plan
+
         self.add_messages(query=query)
         response = self.llm.responses.parse(
-            model=self.model_name,
+            model=model_name or self.model_name,
             input=self.messages,
             tools=self.tools,
             text_format=Plan,
+            extra_body={"prompt_cache_key": self.prompt_cache_key},
+        )
+        return response
+
+    def replan(
+        self,
+        plan: Plan,
+        failed_tasks: list[PlannerTask],
+        task_errors: dict[int, list[str]],
+        completed_summaries: list[dict],
+    ):
+        """Create a plan that only repairs the failed tasks of a plan.
+
+        Only the failed tasks, their errors and summaries of the completed
+        results are sent, not the full conversation, so the finished work is not
+        planned again.
+
+        Args:
+            plan (Plan): The plan that was executed.
+            failed_tasks (list[PlannerTask]): The failed or incomplete tasks.
+            task_errors (dict[int, list[str]]): Error messages per task id.
+            completed_summaries (list[dict]): Summaries of the completed tasks.
+
+        Returns:
+            Plan: A subplan with the repaired tasks.
+        """
+        from utils.schemas import Plan
+
+        repair_request = {
+            "original_query": plan.original_query,
+            "plan_description": plan.description,
+            "max_task_id": max(task.id for task in plan.tasks),
+            "completed_tasks": completed_summaries,
+            "failed_tasks": [
+                {
+                    **task.model_dump(exclude={"status"}),
+                    "errors": task_errors.get(task.id, []),
+                }
+                for task in failed_tasks
+            ],
+        }
+        response = self.llm.responses.parse(
+            model=self.model_name,
+            input=[
+                {"role": "developer", "content": self.dev_prompt},
+                {"role": "developer", "content": REPLANNER_AGENT_PROMPT},
+                {"role": "user", "content": json.dumps(repair_request)},
+            ],
+            tools=self.tools,
+            text_format=Plan,
+            extra_body={"prompt_cache_key": self.prompt_cache_key},
         )
         return response
+
+    async def aplan(self, query: str, model_name: Optional[str] = None):
+        """Create a plan without blocking the event loop.
+
+        Waits for a slot on the "model:<model_name>" key of the scheduler first,
+        if there is one, and reports the real token usage back to it.
+
+        Args:
+            query (str): The request of the user.
+            model_name (str, optional): Model to use instead of `model_name`.
+
+        Returns:
+            Plan: The plan to complete the request of the user.
+        """
+        model_name = model_name or self.model_name
+        prompt = json.dumps(self.messages) + query
+        return await self._scheduled(prompt, model_name, self.plan, query, model_name)
+
+    async def areplan(
+        self,
+        plan: Plan,
+        failed_tasks: list[PlannerTask],
+        task_errors: dict[int, list[str]],
+        completed_summaries: list[dict],
+    ):
+        """Async version of `replan`, scheduled like `aplan`."""
+        prompt = json.dumps(completed_summaries) + str(failed_tasks)
+        return await self._scheduled(
+            prompt,
+            self.model_name,
+            self.replan,
+            plan,
+            failed_tasks,
+            task_errors,
+            completed_summaries,
+        )
+
+    async def _scheduled(self, prompt: str, model_name: str, call, *args):
+        """Run a blocking LLM call in a thread, behind the scheduler if there is one."""
+        if self.scheduler is None:
+            return await asyncio.to_thread(call, *args)
+
+        from openai import RateLimitError
+
+        key = f"model:{model_name}"
+        tokens = estimate_tokens(prompt + json.dumps(self.tools)) + PLAN_OUTPUT_TOKENS
+        ticket = await self.scheduler.acquire(key, tokens=tokens)
+        try:
+            response = await asyncio.to_thread(call, *args)
+        except RateLimitError as e:
+            try:
+                retry_after = float(e.response.headers.get("retry-after", 1))
+            except ValueError:
+                retry_after = 1.0
+            self.scheduler.backoff(key, retry_after)
+            raise
+        if response.usage is not None:
+            self.scheduler.record_usage(ticket, response.usage.total_tokens)
+        return response
@@ -0,0 +1,194 @@
+"""
+Throughput of the worker fleet against the number of workers
+
+Runs the real pipeline (planner, executor, MCP server and client) on
+WorkerFleets of increasing size. The OpenAI API is replaced by a local stub that
+answers every request with the same plan, and `get_weather`'s upstream by the
+stub of benchmarks/mcp_load.py, so only our own code is measured. Prints the
+throughput of every fleet size and its scaling efficiency relative to one
+worker.
+
+Usage:
+    python benchmarks/fleet_scaling.py --workers 1,2,4 --requests 64
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from mcp_load import UpstreamStub, free_port, parse_list, start_server  # noqa: E402
+from utils.WorkerFleet import WorkerFleet  # noqa: E402
+
+# goes to the full model, see utils/Router.py
+QUERY = "Get the weather in Paris and in Rome, then compare them and write a summary"
+
+
+def stub_plan(tasks: int) -> str:
+    return json.dumps(
+        {
+            "original_query": QUERY,
+            "description": "Get the weather of both cities.",
+            "tasks": [
+                {
+                    "id": i,
+                    "description": f"Get the weather of city {i}",
+                    "tool_calls": [
+                        {
+                            "id": str(i),
+                            "name": "get_weather",
+                            "arguments": {
+                                "keys": ["latitude", "longitude"],
+                                "values": ["48.85", "2.35"],
+                            },
+                        }
+                    ],
+                    "thought": "Use get_weather.",
+                    "status": "pending",
+                }
+                for i in range(1, tasks + 1)
+            ],
+        }
+    )
+
+
+class OpenAIStub:
+    """Local stand in for the Responses API, always answers with `plan`."""
+
+    def __init__(self, plan: str):
+        response = {
+            "id": "resp_stub",
+            "object": "response",
+            "created_at": 0,
+            "status": "completed",
+            "model": "stub",
+            "output": [
+                {
+                    "type": "message",
+                    "id": "msg_stub",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [
+                        {"type": "output_text", "text": plan, "annotations": []}
+                    ],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": 1000,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": 200,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": 1200,
+            },
+        }
+        body = json.dumps(response).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+def run(workers: int, requests: int) -> dict:
+    """Run `requests` requests on a fleet of `workers` workers."""
+    fleet = WorkerFleet(num_workers=workers, quiet=True)
+    fleet.start()
+    try:
+        # warm up, one request per worker so every process is connected
+        for _ in range(workers):
+            fleet.submit(QUERY)
+        fleet.wait(timeout=120)
+        fleet.results.clear()
+        start = time.perf_counter()
+        for _ in range(requests):
+            fleet.submit(QUERY)
+        fleet.wait(timeout=600)
+        elapsed = time.perf_counter() - start
+    finally:
+        fleet.shutdown()
+    results = fleet.results.values()
+    return {
+        "workers": workers,
+        "requests": requests,
+        "failed": sum(1 for result in results if not result["ok"]),
+        "seconds": elapsed,
+        "throughput_per_s": requests / elapsed,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=parse_list(int), default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=3, help="tasks per plan")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    upstream = UpstreamStub()
+    openai = OpenAIStub(stub_plan(args.tasks))
+    port = free_port()
+    server = start_server(upstream.url, port)
+    # inherited by the spawned workers
+    os.environ.update(
+        {
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_BASE_URL": openai.url,
+            "MCP_URL": f"http://127.0.0.1:{port}/sse",
+            "OPENAI_RPM": "1000000",
+            "OPENAI_TPM": "1000000000",
+        }
+    )
+    steps = []
+    try:
+        print(f"{os.cpu_count()} cpus, {args.requests} requests per step")
+        for workers in args.workers:
+            step = run(workers, args.requests)
+            step["efficiency"] = step["throughput_per_s"] / (
+                workers * (steps[0]["throughput_per_s"] / steps[0]["workers"])
+                if steps
+                else step["throughput_per_s"]
+            )
+            steps.append(step)
+            print(
+                f"  workers={workers:<3} {step['throughput_per_s']:8.2f} req/s  "
+                f"efficiency {step['efficiency']:5.0%}  failed {step['failed']}"
+            )
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        openai.close()
+        upstream.close()
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(steps, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
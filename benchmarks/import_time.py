@@ -0,0 +1,93 @@
+"""
+Import time budget for the agent entry points
+
+Runs `python -X importtime -c "import <module>"` for each entry point, takes the
+best of a few runs and fails if the cumulative import time of the module goes
+over its budget, or if one of the heavy dependencies gets imported eagerly again.
+
+Usage:
+    python benchmarks/import_time.py [--runs 5] [--scale 1.0]
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# cumulative import time budget per module in milliseconds
+BUDGETS_MS = {
+    "main": 150,
+    "agents.PlannerAgent": 60,
+    "utils.Executor": 60,
+    "utils.OpenAIClient": 60,
+    "MCP.client": 60,
+}
+
+# modules that must only be imported on first use
+LAZY_MODULES = ("openai", "fastmcp", "pydantic", "mcp")
+
+
+def measure(module: str) -> tuple[float, set[str]]:
+    """Import a module in a fresh interpreter and report its import time.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        tuple[float, set[str]]: The cumulative import time in milliseconds and the
+            names of all the modules that got imported along with it.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative_us = None
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        imported.add(name.strip())
+        if name.strip() == module:
+            cumulative_us = int(cumulative)
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {module}")
+    return cumulative_us / 1000, imported
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="runs per module")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiply every budget (slow CI)"
+    )
+    args = parser.parse_args()
+
+    failures = []
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        best = float("inf")
+        eager = set()
+        for _ in range(args.runs):
+            elapsed, imported = measure(module)
+            best = min(best, elapsed)
+            eager |= {name for name in imported if name.split(".")[0] in LAZY_MODULES}
+        status = "ok" if best <= budget and not eager else "FAIL"
+        print(f"{status:4} {module:24} {best:8.1f} ms (budget {budget:.0f} ms)")
+        if best > budget:
+            failures.append(f"{module} took {best:.1f} ms, budget is {budget:.0f} ms")
+        if eager:
+            failures.append(f"{module} eagerly imports {sorted(eager)[:5]}")
+
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""
+Load generator and concurrency sweep for the MCP tool server
+
+Starts the real FastMCP server (MCP/server.py) over SSE with `get_weather`
+pointed at a local stub of its upstream, then drives `call_tool` through a pool
+of MCPClients. For every payload size it either
+
+- closed loop: sweeps the number of concurrent callers, each one sending its
+  next call as soon as the previous one returns, or
+- open loop: sweeps the offered rate, sending calls on a fixed schedule whatever
+  the latency is. Latency is measured from the scheduled send time so a slow
+  server is not hidden by callers backing off.
+
+Throughput and a latency histogram are recorded per step and the saturation
+point is reported: the last step after which throughput stops growing while
+latency keeps climbing (closed loop), or the last rate the server keeps up with
+(open loop).
+
+Usage:
+    python benchmarks/mcp_load.py closed --concurrency 1,2,4,8,16,32 --payloads 0,4096
+    python benchmarks/mcp_load.py open --rates 10,50,100,200 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from MCP.client import MCPClient  # noqa: E402
+
+TOOL = "get_weather"
+ARGUMENTS = {"latitude": "48.85", "longitude": "2.35"}
+
+
+class LatencyHistogram:
+    """Log bucketed latency histogram, each bucket is `growth` times wider."""
+
+    def __init__(self, smallest: float = 1e-4, growth: float = 1.1):
+        self.smallest = smallest
+        self.growth = growth
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = max(
+            0,
+            math.ceil(
+                math.log(max(seconds, self.smallest) / self.smallest, self.growth)
+            ),
+        )
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def upper_bound(self, index: int) -> float:
+        return self.smallest * self.growth**index
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile, in seconds."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000 * self.percentile(50),
+            "p90_ms": 1000 * self.percentile(90),
+            "p99_ms": 1000 * self.percentile(99),
+            "max_ms": 1000 * self.max,
+            "buckets_ms": {
+                f"{1000 * self.upper_bound(index):.2f}": self.buckets[index]
+                for index in sorted(self.buckets)
+            },
+        }
+
+
+class UpstreamStub:
+    """Local stand in for the open-meteo API, returns `payload_size` bytes of padding."""
+
+    def __init__(self):
+        self.payload_size = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(
+                    {
+                        "current": {
+                            "temperature_2m": 21.3,
+                            "wind_speed_10m": 7.4,
+                            "padding": "x" * stub.payload_size,
+                        }
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1/forecast"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(
+    upstream_url: str, port: int, timeout: float = 30.0
+) -> subprocess.Popen:
+    """Run MCP/server.py with SSE transport and wait until it accepts connections."""
+    env = {**os.environ, "OPEN_METEO_URL": upstream_url, "MCP_PORT": str(port)}
+    process = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=ROOT / "MCP",
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"MCP server exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("MCP server did not start in time")
+
+
+class LoadRunner:
+    """Drives `call_tool` through a pool of connected MCPClients."""
+
+    def __init__(self, url: str, pool_size: int):
+        self.clients = [MCPClient(url) for _ in range(pool_size)]
+        self._next = 0
+
+    async def connect(self) -> None:
+        for client in self.clients:
+            await client.connect()
+
+    async def disconnect(self) -> None:
+        for client in self.clients:
+            await client.disconnect()
+
+    def client(self) -> MCPClient:
+        client = self.clients[self._next % len(self.clients)]
+        self._next += 1
+        return client
+
+    async def _call(
+        self, histogram: LatencyHistogram, started: float, errors: list
+    ) -> Optional[float]:
+        """Call the tool once and return when it finished, None if it failed."""
+        try:
+            await self.client().call_tool(TOOL, ARGUMENTS)
+        except Exception as e:
+            errors.append(str(e))
+            return None
+        finished = time.perf_counter()
+        histogram.record(finished - started)
+        return finished
+
+    async def closed_loop(self, concurrency: int, duration: float) -> dict:
+        histogram, errors = LatencyHistogram(), []
+        stop = time.perf_counter() + duration
+
+        async def caller():
+            while time.perf_counter() < stop:
+                await self._call(histogram, time.perf_counter(), errors)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return self._result(histogram, errors, elapsed, concurrency=concurrency)
+
+    async def open_loop(self, rate: float, duration: float) -> dict:
+        histogram, errors = LatencyHistogram(), []
+        calls = []
+        start = time.perf_counter()
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # latency counts from the scheduled time, not from when we got to send
+            calls.append(asyncio.create_task(self._call(histogram, scheduled, errors)))
+        finished = await asyncio.gather(*calls)
+        # throughput is what completed inside the scheduled window, calls that
+        # finish after it show up as late instead of inflating the rate
+        window_end = start + duration
+        in_window = sum(1 for end in finished if end is not None and end <= window_end)
+        step = self._result(histogram, errors, duration, offered_rate=rate)
+        step["throughput_per_s"] = in_window / duration
+        step["late"] = sum(
+            1 for end in finished if end is not None and end > window_end
+        )
+        return step
+
+    @staticmethod
+    def _result(
+        histogram: LatencyHistogram, errors: list, elapsed: float, **step
+    ) -> dict:
+        return {
+            **step,
+            "throughput_per_s": histogram.count / elapsed,
+            "errors": len(errors),
+            "first_error": errors[0] if errors else None,
+            "latency": histogram.summary(),
+        }
+
+
+def closed_loop_saturation(steps: list[dict], min_gain: float = 0.1) -> dict | None:
+    """Last step before throughput grows less than `min_gain` while p99 keeps rising."""
+    for previous, step in zip(steps, steps[1:]):
+        gain = step["throughput_per_s"] / max(previous["throughput_per_s"], 1e-9) - 1
+        if (
+            gain < min_gain
+            and step["latency"]["p99_ms"] > previous["latency"]["p99_ms"]
+        ):
+            return previous
+    return None
+
+
+def open_loop_saturation(steps: list[dict], keep_up: float = 0.95) -> dict | None:
+    """Last offered rate the server completes without errors and within `keep_up`."""
+    saturated = None
+    for step in steps:
+        if step["errors"] or step["throughput_per_s"] < keep_up * step["offered_rate"]:
+            break
+        saturated = step
+    return saturated
+
+
+def print_step(step: dict) -> None:
+    latency = step["latency"]
+    load = (
+        f"c={step['concurrency']:<4}"
+        if "concurrency" in step
+        else f"rate={step['offered_rate']:<6g}"
+    )
+    print(
+        f"  {load} {step['throughput_per_s']:9.1f} req/s  "
+        f"p50 {latency['p50_ms']:8.1f} ms  p90 {latency['p90_ms']:8.1f} ms  "
+        f"p99 {latency['p99_ms']:8.1f} ms  errors {step['errors']}"
+    )
+
+
+async def sweep(args, stub: UpstreamStub, url: str) -> list[dict]:
+    runner = LoadRunner(url, args.clients)
+    await runner.connect()
+    results = []
+    try:
+        for payload in args.payloads:
+            stub.payload_size = payload
+            print(f"{args.mode} loop, payload {payload} bytes, {args.clients} clients")
+            await runner.closed_loop(1, args.warmup)  # warm up connections
+            steps = []
+            for level in args.concurrency if args.mode == "closed" else args.rates:
+                if args.mode == "closed":
+                    step = await runner.closed_loop(level, args.duration)
+                else:
+                    step = await runner.open_loop(level, args.duration)
+                print_step(step)
+                steps.append(step)
+            saturation = (
+                closed_loop_saturation(steps)
+                if args.mode == "closed"
+                else open_loop_saturation(steps)
+            )
+            if saturation is None:
+                print("  no saturation point found in this range")
+            else:
+                print("  saturation point:", end="")
+                print_step(saturation)
+            results.append(
+                {"payload": payload, "steps": steps, "saturation": saturation}
+            )
+    finally:
+        await runner.disconnect()
+    return results
+
+
+def parse_list(kind):
+    return lambda value: [kind(item) for item in value.split(",") if item]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("mode", choices=("closed", "open"))
+    parser.add_argument(
+        "--concurrency", type=parse_list(int), default=[1, 2, 4, 8, 16, 32, 64]
+    )
+    parser.add_argument(
+        "--rates", type=parse_list(float), default=[10, 25, 50, 100, 200, 400]
+    )
+    parser.add_argument("--payloads", type=parse_list(int), default=[0, 4096, 65536])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per step")
+    parser.add_argument("--warmup", type=float, default=1.0, help="seconds per payload")
+    parser.add_argument("--clients", type=int, default=4, help="MCP client pool size")
+    parser.add_argument("--url", help="use a running server instead of starting one")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    stub = UpstreamStub()
+    server = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        server = start_server(stub.url, port)
+        url = f"http://127.0.0.1:{port}/sse"
+    try:
+        results = asyncio.run(sweep(args, stub, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        stub.close()
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps({"mode": args.mode, "results": results}, indent=2)
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,15 +7,26 @@ to complete the request. The plan is then executed by an executor.
 
 import os
 import asyncio
+import argparse
 import logging
 from dotenv import load_dotenv
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 from utils.OpenAIClient import OpenAIClient
 from MCP.client import MCPClient
 from utils.Executor import Executor
 from agents.PlannerAgent import PlannerAgent
+from utils.Router import Router
 from utils.prompts import PLANNER_AGENT_PROMPT
-from utils.schemas import Plan
+from utils.Scheduler import (
+    PRIORITIES,
+    SchedulerOverloaded,
+    current_priority,
+    current_tenant,
+    get_scheduler,
+)
+
+if TYPE_CHECKING:
+    from utils.schemas import Plan
 
 load_dotenv()
 
@@ -25,16 +36,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "gpt-4.1-mini"
+# model for trivial lookups and questions, see utils/Router.py
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "gpt-4.1-nano")
+MAX_REPLANS = int(os.getenv("MAX_REPLANS", 2))
 
-async def initialize_agent_service() -> Tuple[Executor, PlannerAgent, MCPClient]:
+
+def configure_scheduler():
+    """Set the provider limits on the process wide scheduler from the environment."""
+    scheduler = get_scheduler()
+    scheduler.max_waiting = int(os.getenv("SCHEDULER_MAX_WAITING", 1000))
+    # number of processes sharing the provider limits, set by the worker fleet
+    share = int(os.getenv("SCHEDULER_SHARE", 1))
+    scheduler.set_limit(
+        f"model:{MODEL_NAME}",
+        requests_per_minute=float(os.getenv("OPENAI_RPM", 500)) / share,
+        tokens_per_minute=float(os.getenv("OPENAI_TPM", 200000)) / share,
+    )
+    scheduler.set_limit(
+        f"model:{FAST_MODEL_NAME}",
+        requests_per_minute=float(os.getenv("OPENAI_FAST_RPM", 500)) / share,
+        tokens_per_minute=float(os.getenv("OPENAI_FAST_TPM", 200000)) / share,
+    )
+    # ie MCP_TOOL_RPM="get_weather=60,search=120"
+    for limit in os.getenv("MCP_TOOL_RPM", "").split(","):
+        if "=" in limit:
+            tool, rpm = limit.split("=", 1)
+            scheduler.set_limit(
+                f"tool:{tool.strip()}", requests_per_minute=float(rpm) / share
+            )
+    return scheduler
+
+
+async def initialize_agent_service() -> Tuple[Executor, Router, MCPClient]:
     """Initialize and return the OrchestratorAgent with MCP client integration.
 
     Returns:
         Tuple[OrchestratorAgent, MCPClient]: A tuple containing the initialized OrchestratorAgent and MCPClient.
     """
     try:
+        scheduler = configure_scheduler()
+
         logger.info("Initializing MCP client ...")
-        mcp_client = MCPClient()
+        mcp_client = MCPClient(
+            os.getenv("MCP_URL", "http://localhost:8050/sse"),
+            scheduler=scheduler,
+            pool_size=int(os.getenv("MCP_POOL_SIZE", 1)),
+        )
         await mcp_client.connect()
 
         logger.info("Getting tools from MCP ...")
@@ -69,10 +117,13 @@ async def initialize_agent_service() -> Tuple[Executor, PlannerAgent, MCPClient]
                 llm=llm,
                 messages=[],
                 tools=agent_tools,
-                model_name="gpt-4.1-mini",
+                model_name=MODEL_NAME,
+                scheduler=scheduler,
             )
             logger.info("Successfully initialized PlannerAgent")
-            return executor, planner, mcp_client
+            # route simple requests to a template or a faster model
+            router = Router(planner, fast_model_name=FAST_MODEL_NAME)
+            return executor, router, mcp_client
 
         except Exception as agent_init_error:
             logger.error(
@@ -96,7 +147,11 @@ async def initialize_agent_service() -> Tuple[Executor, PlannerAgent, MCPClient]
 
 
 async def create_execute_plan(
-    executor: Executor, planer: PlannerAgent, content: str
+    executor: Executor,
+    planer: Router,
+    content: str,
+    priority: str = "interactive",
+    tenant: str = "default",
 ) -> bool:
     """
     Process a single email file and place orders based on its content using the agentic workflow.
@@ -104,18 +159,56 @@ async def create_execute_plan(
         agent: Initialized OrchestratorAgent
         mcp_client: Initialized MCPClient
         file_path: Path to the email file to process
+        priority: Scheduler priority class of the request, "interactive" or "batch"
+        tenant: Tenant the request is queued under for fair scheduling
     Returns:
         bool: True if processing was successful, False otherwise
     """
+    # every planner and tool call made below is scheduled under this priority/tenant
+    current_priority.set(priority)
+    current_tenant.set(tenant)
     # Try to process the email using agent
     try:
-        plan = planer.plan(content)  # create a plan
+        plan = await planer.aplan(content)  # create a plan
 
-        plan_parsed: Plan = plan.output_parsed  # parse the plan
+        plan_parsed: "Plan" = plan.output_parsed  # parse the plan
         logger.info(f"Created plan: {plan_parsed}")
 
         res = await executor.execute_plan(plan_parsed)  # execute the plan
         logger.info(f"Execution results: {res}")
+
+        # repair failed tasks only, completed results are reused
+        for attempt in range(MAX_REPLANS):
+            failed = executor.failed_tasks(plan_parsed)
+            if not failed:
+                break
+            logger.info(
+                f"Replanning {len(failed)} failed tasks (attempt {attempt + 1}/{MAX_REPLANS})"
+            )
+            repair = await planer.areplan(
+                plan_parsed,
+                failed,
+                executor.task_errors,
+                executor.summarize_results(),
+            )
+            replaced = executor.merge_subplan(plan_parsed, repair.output_parsed, failed)
+            if len(replaced) < len(failed):
+                # failed tasks without a replacement stay failed
+                logger.warning(
+                    f"Repair replaced {len(replaced)} of {len(failed)} failed tasks"
+                )
+            res = await executor.execute_plan(plan_parsed)  # only runs repaired tasks
+            logger.info(f"Execution results after replanning: {res}")
+
+        failed = executor.failed_tasks(plan_parsed)
+        if failed:
+            logger.warning(f"{len(failed)} tasks still failing after replanning")
+            return False
+        return True
+    except SchedulerOverloaded as overloaded:
+        # backpressure, the caller should retry later or shed the request
+        logger.warning(f"Request rejected, scheduler overloaded: {overloaded}")
+        return False
     except Exception as process_error:  # Exception as process_error
         logger.error(
             f"Error in agentic email processing: {str(process_error)}", exc_info=True
@@ -123,14 +216,24 @@ async def create_execute_plan(
         return False
 
 
-async def run_agent() -> None:
-    """ """
+async def run_agent(
+    query: str = "write something about ...",
+    priority: str = "interactive",
+    tenant: str = "default",
+) -> None:
+    """Create and execute a plan for a single request in this process.
+
+    Args:
+        query: The request of the user
+        priority: Scheduler priority class of the request
+        tenant: Tenant the request is queued under
+    """
 
     # Initialize agent service
-    query = "write something about ..."
     try:
         orchestrator, planner, mcp_client = await initialize_agent_service()
-        await create_execute_plan(orchestrator, planner, query)
+        await create_execute_plan(orchestrator, planner, query, priority, tenant)
+        logger.info(f"Planner routes: {planner.report()}")
     except Exception as e:
         logger.error(f"Error in email processing workflow: {str(e)}")
     finally:
@@ -139,6 +242,60 @@ async def run_agent() -> None:
             await mcp_client.disconnect()
 
 
+def run_fleet(
+    queries: list[str],
+    workers: int,
+    priority: str = "batch",
+    tenant: str = "default",
+) -> dict:
+    """Execute the requests on a fleet of worker processes.
+
+    Args:
+        queries: The requests of the users
+        workers: Number of worker processes
+        priority: Scheduler priority class of the requests
+        tenant: Tenant the requests are queued under
+    Returns:
+        dict: The aggregated metrics of the fleet
+    """
+    from utils.WorkerFleet import WorkerFleet
+
+    fleet = WorkerFleet(num_workers=workers)
+    fleet.start()
+    try:
+        for query in queries:
+            fleet.submit(query, priority=priority, tenant=tenant)
+        fleet.wait()
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, letting workers finish their current request ...")
+    finally:
+        fleet.shutdown()
+    metrics = fleet.metrics()
+    logger.info(f"Fleet metrics: {metrics}")
+    return metrics
+
+
 if __name__ == "__main__":
-    # Run the async main function
-    asyncio.run(run_agent())
+    parser = argparse.ArgumentParser(description="Plan and execute user requests")
+    parser.add_argument("queries", nargs="*", default=["write something about ..."])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="run the requests on this many worker processes (0 runs in process)",
+    )
+    parser.add_argument(
+        "--priority",
+        choices=sorted(PRIORITIES),
+        help="scheduler priority of the requests (default: interactive in "
+        "process, batch with --workers)",
+    )
+    parser.add_argument("--tenant", default="default", help="tenant of the requests")
+    args = parser.parse_args()
+
+    if args.workers > 0:
+        run_fleet(args.queries, args.workers, args.priority or "batch", args.tenant)
+    else:
+        # Run the async main function
+        for query in args.queries:
+            asyncio.run(run_agent(query, args.priority or "interactive", args.tenant))
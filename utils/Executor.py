@@ -1,5 +1,14 @@
-from utils.schemas import Plan, PlannerTask, ToolCall
-from MCP.client import MCPClient
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+from utils.Scheduler import SchedulerOverloaded
+
+if TYPE_CHECKING:
+    from utils.schemas import Plan, PlannerTask, ToolCall
+    from MCP.client import MCPClient
+
+# tools whose arguments extract_tools fills from previous_task_results
+RESULT_CONSUMING_TOOLS = ("review_tool", "assemble_content", "writer_tool", "save_txt")
 
 
 class Executor:
@@ -18,6 +27,10 @@ class Executor:
         Initialize the orchestrator
         """
         self.mcp_client = mcp_client
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear the state of the previous request so the executor can be reused"""
         self.tool_call_history: list = []
         self.previous_task_results: list = [
             {
@@ -28,6 +41,8 @@ class Executor:
         ]
         self.essay = ""
         self.logs: list[str] = []  # <-- New line
+        self.task_errors: dict[int, list[str]] = {}  # task id -> error messages
+        self.completed_task_ids: set[int] = set()
 
     def print_task(self, task: PlannerTask) -> None:
         """Print the given task generated by the planner agent
@@ -153,6 +168,9 @@ class Executor:
                     }
                 )
 
+            # Let backpressure reach the entry point instead of recording an error
+            except SchedulerOverloaded:
+                raise
             # Handle exceptions
             except Exception as e:
                 print("AT EXCEPTION")
@@ -169,6 +187,10 @@ class Executor:
     async def execute_task(self, task: PlannerTask) -> list[dict]:
         """Execute the given task generated by the planner agent
 
+        Sets the status of the task to "completed" when every tool call
+        succeeded, "error" when one failed and "incomplete" when the task had
+        no tool calls. Error messages are kept in `task_errors`.
+
         Args:
             task: The task to execute.
 
@@ -179,12 +201,17 @@ class Executor:
 
         # print current task
         self.print_task(task)
+        errors = []
         tool_calls = []  # list to hold tool_calls in current task
         for i in range(len(task.tool_calls)):  # for every tool call in the task
             tool_call = task.tool_calls[i]  # select the tool call
-            tools = self.extract_tools(
-                tool_call
-            )  # extract the tool into {name: tool_name, arguments: {...}
+            try:
+                tools = self.extract_tools(
+                    tool_call
+                )  # extract the tool into {name: tool_name, arguments: {...}
+            except ValueError as e:
+                errors.append(str(e))
+                continue
             tool_calls.append(tools)  # add tool to tool_Calls list
 
         print(f"TOOL_CALLS: {tool_calls}")
@@ -194,6 +221,20 @@ class Executor:
         results = [
             result["result"] for result in tool_call_results if "result" in result
         ]  # get the results only
+        errors += [
+            result["message"] for result in tool_call_results if result.get("error")
+        ]
+
+        if errors:
+            task.status = "error"
+            self.task_errors[task.id] = errors
+        elif not task.tool_calls:
+            task.status = "incomplete"
+            self.task_errors[task.id] = ["Task has no tool calls"]
+        else:
+            task.status = "completed"
+            self.task_errors.pop(task.id, None)
+            self.completed_task_ids.add(task.id)
 
         return results
         # return ''
@@ -245,6 +286,9 @@ class Executor:
     async def execute_plan(self, plan: Plan) -> list:
         """Execute the given plan generated by the planner agent
 
+        Tasks that are already completed are skipped, so a plan can be executed
+        again after failed tasks were replaced with `merge_subplan`.
+
         Args:
             plan: The plan to execute.
 
@@ -263,9 +307,11 @@ class Executor:
         ]  # list to hold results of each task execution.
         for i in range(len(plan.tasks)):  # iterate through tasks
             task: PlannerTask = plan.tasks[i]  # select the task
+            if task.id in self.completed_task_ids:  # keep results of finished work
+                continue
             res = await self.execute_task(task)  # execute task
-            # append task execution results to list
-            self.previous_task_results.append(
+            # add or replace task execution results
+            self.save_task_results(
                 {
                     "task_id": task.id,
                     "task": task.description,
@@ -274,3 +320,138 @@ class Executor:
             )
 
         return results
+
+    def save_task_results(self, task_results: dict) -> None:
+        """Save the results of a task, replacing the ones of an earlier attempt
+
+        Args:
+            task_results: The task id, description and results of the task.
+
+        Returns:
+            None
+        """
+        for i in range(len(self.previous_task_results)):
+            if self.previous_task_results[i]["task_id"] == task_results["task_id"]:
+                self.previous_task_results[i] = task_results
+                return
+        self.previous_task_results.append(task_results)
+
+    def failed_tasks(self, plan: Plan) -> list[PlannerTask]:
+        """Return the tasks of the plan that failed or are incomplete
+
+        Args:
+            plan: The executed plan.
+
+        Returns:
+            The tasks that need to be planned again
+        """
+        return [task for task in plan.tasks if task.id not in self.completed_task_ids]
+
+    def summarize_results(self, max_chars: int = 300) -> list[dict]:
+        """Summarize the results of the completed tasks for the planner
+
+        Results are truncated to `max_chars` so replanning does not send every
+        tool output back to the LLM.
+
+        Args:
+            max_chars: Maximum length of a single result summary.
+
+        Returns:
+            A list of {"task_id", "task", "summary"} dicts
+        """
+        summaries = []
+        for task_result in self.previous_task_results[1:]:  # skip the placeholder
+            if task_result["task_id"] not in self.completed_task_ids:
+                continue
+            summary = str(task_result["results"])
+            if len(summary) > max_chars:
+                summary = summary[:max_chars] + "..."
+            summaries.append(
+                {
+                    "task_id": task_result["task_id"],
+                    "task": task_result["task"],
+                    "summary": summary,
+                }
+            )
+        return summaries
+
+    def merge_subplan(
+        self, plan: Plan, subplan: Optional[Plan], failed_tasks: list[PlannerTask]
+    ) -> list[int]:
+        """Merge a repaired subplan back into the plan
+
+        A failed task is only dropped when the subplan has a task with its id to
+        take its place, as asked by the replanner prompt. Failed tasks without a
+        replacement stay in the plan, still failed, so an empty or partial repair
+        is not mistaken for a successful one. Other tasks of the subplan are put
+        after the last replacement. Completed tasks after the first replacement
+        whose tools read the results of earlier tasks are marked stale so they
+        run again with the repaired results.
+
+        Args:
+            plan: The plan being executed.
+            subplan: The repaired tasks returned by the planner, None if it refused.
+            failed_tasks: The tasks that were sent to the planner.
+
+        Returns:
+            The ids of the failed tasks that were replaced
+        """
+        if subplan is None:
+            return []
+        failed_ids = {task.id for task in failed_tasks}
+        replacements = {
+            task.id: task for task in subplan.tasks if task.id in failed_ids
+        }
+        kept_ids = {task.id for task in plan.tasks}
+        next_id = max([task.id for task in plan.tasks + subplan.tasks] + [0]) + 1
+        added = []
+        for task in subplan.tasks:
+            if replacements.get(task.id) is task:
+                continue
+            if task.id in kept_ids:  # never overwrite a task we keep
+                task.id = next_id
+                next_id += 1
+            kept_ids.add(task.id)
+            added.append(task)
+        for task in subplan.tasks:
+            task.status = "pending"
+
+        tasks = []
+        replaced = 0
+        for task in plan.tasks:
+            if task.id in replacements:
+                tasks.append(replacements[task.id])
+                replaced += 1
+                if replaced == len(replacements):
+                    tasks += added
+                continue
+            if replaced and self.reads_previous_results(task):
+                # built from results that missed the failed task, run it again
+                self.completed_task_ids.discard(task.id)
+                task.status = "pending"
+            tasks.append(task)
+        if not replacements:
+            tasks += added
+        plan.tasks = tasks
+
+        # forget results of the failed attempts of replaced tasks
+        self.previous_task_results = [
+            task_result
+            for task_result in self.previous_task_results
+            if task_result["task_id"] not in replacements
+        ]
+        return sorted(replacements)
+
+    def reads_previous_results(self, task: PlannerTask) -> bool:
+        """Whether a task has tool calls fed from `previous_task_results`
+
+        Args:
+            task: The task to check.
+
+        Returns:
+            True if `extract_tools` fills one of its arguments with earlier results
+        """
+        return any(
+            tool_call.name.split(".")[-1] in RESULT_CONSUMING_TOOLS
+            for tool_call in task.tool_calls
+        )
@@ -1,4 +1,9 @@
-from openai import OpenAI
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 class OpenAIClient:
@@ -9,14 +14,20 @@ class OpenAIClient:
             api_key: The api key for our openai model
         Returns:
         """
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.client: Optional[OpenAI] = None
 
     def get_client(self) -> OpenAI:
-        """
+        """Create the openai client on first use and return it.
+
         Args:
             None
 
         Returns:
             The openai client
         """
+        if self.client is None:
+            from openai import OpenAI
+
+            self.client = OpenAI(api_key=self.api_key)
         return self.client
@@ -0,0 +1,278 @@
+"""
+Model routing for the planner
+
+Requests are classified with cheap local heuristics. Trivial requests that match
+a template get a plan built locally without calling the LLM, other trivial
+requests go to a faster model and everything else to the planner's model.
+Latency, input tokens and cached input tokens are recorded per route so the
+savings of routing and prompt caching can be checked.
+"""
+
+import re
+import time
+from typing import Callable, Optional
+
+from agents.PlannerAgent import PlannerAgent
+
+# words that usually mean the request has several steps
+STEP_WORDS = re.compile(
+    r"\b(then|after|before|and|also|finally|next|compare|each|every|both)\b", re.I
+)
+# verbs asking for content to be produced, these need a research -> writer_tool ->
+# review_tool style plan and are never trivial
+CONTENT_VERBS = re.compile(
+    r"\b(research|write|draft|rewrite|compose|edit|review|proofread|summari[sz]e|"
+    r"assemble|compare|analy[sz]e|translate|create|generate|make|plan|outline|"
+    r"explain|describe|save|store|export|send|email|post|publish)\b",
+    re.I,
+)
+# verbs asking for a single piece of information
+LOOKUP_VERBS = re.compile(r"\b(get|fetch|find|check|look|show|tell|give)\b", re.I)
+# "what is ...", "how warm is ...", "is it ..."
+QUESTION = re.compile(
+    r"^\s*(what|what's|who|when|where|which|how|is|are|does|do|will|can)\b", re.I
+)
+# "1. ...", "2) ...", "- ..." at the start of a line
+LIST_ITEMS = re.compile(r"^\s*(\d+[.)]|[-*])\s", re.M)
+# separators between clauses: commas, semicolons, "and", "then"
+CLAUSES = re.compile(r"[,;]|\b(?:and|then)\b", re.I)
+# "<lat>, <lon>" not glued to other digits, ie not "1234, 56" or "2024, 5 days"
+COORDINATES = re.compile(
+    r"(?<![\w.])(-?\d{1,3}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)(?![\w.])"
+)
+
+
+def classify(query: str) -> str:
+    """Classify the complexity of a request.
+
+    Only a short single lookup or question ("weather at 48.85, 2.35", "what is
+    the temperature in Paris?") is trivial and may go to the fast model or a
+    template. Anything asking for content to be written, reviewed or saved is
+    where most of the planning quality matters, so it is never trivial.
+
+    Args:
+        query (str): The request of the user.
+
+    Returns:
+        str: "trivial", "simple" or "complex"
+    """
+    words = len(query.split())
+    content_verbs = len(CONTENT_VERBS.findall(query))
+    verbs = content_verbs + len(LOOKUP_VERBS.findall(query))
+    # the comma of "<lat>, <lon>" does not start a new clause
+    clauses = 1 + len(CLAUSES.findall(COORDINATES.sub("", query)))
+    steps = (
+        len(STEP_WORDS.findall(query))
+        + len(LIST_ITEMS.findall(query))
+        + max(0, query.count("?") - 1)
+    )
+    lookup = bool(QUESTION.match(query) or LOOKUP_VERBS.search(query))
+    if (
+        words <= 12
+        and content_verbs == 0
+        and verbs <= 1
+        and clauses == 1
+        and steps == 0
+        and (lookup or query.strip().endswith("?") or parse_coordinates(query))
+    ):
+        return "trivial"
+    if words <= 30 and verbs <= 2 and clauses <= 2 and steps <= 1:
+        return "simple"
+    return "complex"
+
+
+def parse_coordinates(query: str) -> Optional[tuple[str, str]]:
+    """Return the first "<lat>, <lon>" pair of a request that is a valid position."""
+    for latitude, longitude in COORDINATES.findall(query):
+        if -90 <= float(latitude) <= 90 and -180 <= float(longitude) <= 180:
+            return latitude, longitude
+    return None
+
+
+def weather_template(query: str, tool_names: list[str]):
+    """Single get_weather task for "weather at <lat>, <lon>" requests."""
+    from utils.schemas import Plan
+
+    coordinates = parse_coordinates(query)
+    if (
+        "get_weather" not in tool_names
+        or not re.search(r"\b(weather|temperature)\b", query, re.I)
+        or coordinates is None
+    ):
+        return None  # leave it to the LLM
+    latitude, longitude = coordinates
+    return Plan.model_validate(
+        {
+            "original_query": query,
+            "description": "Get the current weather at the given coordinates.",
+            "tasks": [
+                {
+                    "id": 1,
+                    "description": f"Get the current weather at {latitude}, {longitude}",
+                    "thought": "The request only needs the get_weather tool.",
+                    "status": "pending",
+                    "tool_calls": [
+                        {
+                            "id": "1",
+                            "name": "get_weather",
+                            "arguments": {
+                                "keys": ["latitude", "longitude"],
+                                "values": [latitude, longitude],
+                            },
+                        }
+                    ],
+                }
+            ],
+        }
+    )
+
+
+# builders returning a Plan for the trivial requests they recognize, or None
+TEMPLATES: list[Callable] = [weather_template]
+
+
+class TemplateResponse:
+    """Stands in for an LLM response when the plan comes from a template."""
+
+    def __init__(self, plan):
+        self.output_parsed = plan
+        self.usage = None
+
+
+class Router:
+    """Routes planner requests to a template, a fast model or the full model.
+
+    Has the same interface as PlannerAgent (aplan, areplan, reset) so it can be
+    used in its place.
+
+    Attributes:
+        planner: The planner agent doing the LLM calls.
+        fast_model_name: Model used for trivial requests.
+        templates: Template plan builders tried for trivial requests.
+        stats: Calls, errors, latency and token usage per route.
+    """
+
+    def __init__(
+        self,
+        planner: PlannerAgent,
+        fast_model_name: str = "gpt-4.1-nano",
+        templates: Optional[list[Callable]] = None,
+    ):
+        self.planner = planner
+        self.fast_model_name = fast_model_name
+        self.templates = TEMPLATES if templates is None else templates
+        self.tool_names = [tool.get("name", "") for tool in planner.tools]
+        self.stats: dict[str, dict[str, float]] = {}
+
+    @property
+    def model_name(self) -> str:
+        return self.planner.model_name
+
+    def reset(self):
+        self.planner.reset()
+
+    def route(self, query: str) -> tuple[str, Optional[object]]:
+        """Pick the route of a request.
+
+        Returns:
+            tuple[str, Plan | None]: The route and the template plan if the
+                route is "template".
+        """
+        # only trivial requests are worth the risk of a weaker plan
+        if classify(query) != "trivial":
+            return "full", None
+        for template in self.templates:
+            plan = template(query, self.tool_names)
+            if plan is not None:
+                return "template", plan
+        return "fast", None
+
+    async def aplan(self, query: str):
+        """Create a plan for the request on the route picked for it.
+
+        Args:
+            query (str): The request of the user.
+
+        Returns:
+            The LLM response, or a TemplateResponse, with the plan in `output_parsed`.
+        """
+        start = time.perf_counter()
+        route, plan = self.route(query)
+        response = None
+        try:
+            if route == "template":
+                response = TemplateResponse(plan)
+            elif route == "fast":
+                response = await self.planner.aplan(
+                    query, model_name=self.fast_model_name
+                )
+            else:
+                response = await self.planner.aplan(query)
+            return response
+        finally:
+            # failed calls and 429s count towards the latency of the route too
+            self.record(route, time.perf_counter() - start, response)
+
+    async def areplan(self, *args):
+        """Repairs always go to the full model, see PlannerAgent.replan."""
+        start = time.perf_counter()
+        response = None
+        try:
+            response = await self.planner.areplan(*args)
+            return response
+        finally:
+            self.record("replan", time.perf_counter() - start, response)
+
+    def record(self, route: str, latency: float, response) -> None:
+        """Record a call of a route, `response` is None if the call failed."""
+        stats = self.stats.setdefault(
+            route,
+            {
+                "calls": 0,
+                "errors": 0,
+                "latency": 0.0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+            },
+        )
+        stats["calls"] += 1
+        stats["latency"] += latency
+        if response is None:
+            stats["errors"] += 1
+            return
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            stats["input_tokens"] += usage.input_tokens
+            details = getattr(usage, "input_tokens_details", None)
+            stats["cached_tokens"] += getattr(details, "cached_tokens", 0) or 0
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """Mean latency and cached token ratio per route."""
+        return route_report(self.stats)
+
+
+def route_report(stats: dict[str, dict[str, float]]) -> dict[str, dict[str, float]]:
+    """Turn raw per route stats, as summed over workers, into a report.
+
+    Args:
+        stats (dict): Calls, errors, latency and token sums per route.
+
+    Returns:
+        dict: Calls, errors, mean latency and cached token ratio per route.
+    """
+    return {
+        route: {
+            "calls": route_stats["calls"],
+            "errors": route_stats["errors"],
+            "mean_latency_s": route_stats["latency"] / route_stats["calls"],
+            "input_tokens": route_stats["input_tokens"],
+            "cached_tokens": route_stats["cached_tokens"],
+            "cached_ratio": (
+                route_stats["cached_tokens"] / route_stats["input_tokens"]
+                if route_stats["input_tokens"]
+                else 0.0
+            ),
+        }
+        for route, route_stats in stats.items()
+        if route_stats["calls"]
+    }
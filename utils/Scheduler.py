@@ -0,0 +1,357 @@
+"""
+Process wide rate limiter and priority scheduler for LLM and tool calls
+
+Every model and every tool gets a key ("model:gpt-4.1-mini", "tool:get_weather")
+with its own token buckets, one for requests per minute and one for tokens per
+minute. Callers wait for a slot on a key. Waiters are served by priority class
+first and round robin between tenants inside a class, so interactive requests do
+not queue behind batch jobs and one tenant can not starve the others.
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+# lower value is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# priority and tenant of the request currently being processed. Set by the entry
+# points so nested calls (planner, tool calls) inherit them without threading
+# them through every signature.
+current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_priority", default="interactive"
+)
+current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_tenant", default="default"
+)
+
+
+class SchedulerOverloaded(Exception):
+    """Raised when too many calls are already waiting for a slot."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate, roughly four characters per token."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0  # per second
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds to wait before `amount` tokens are available."""
+        now = time.monotonic()
+        self._refill(now)
+        # never wait for more than a full bucket, oversized calls go through alone
+        amount = min(amount, self.capacity)
+        wait = max(0.0, self.paused_until - now)
+        if self.tokens < amount:
+            wait = max(wait, (amount - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, amount: float) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= amount
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for `seconds`, used after a 429."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """Change the rate and capacity, keeping the tokens already used."""
+        self._refill(time.monotonic())
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = min(self.tokens, self.capacity)
+
+
+class Limit:
+    """Request and token buckets for a single key."""
+
+    def __init__(
+        self, requests_per_minute: float, tokens_per_minute: Optional[float] = None
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute is not None else None
+        )
+
+    def delay_for(self, tokens: int) -> float:
+        delay = self.requests.delay_for(1)
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.delay_for(tokens))
+        return delay
+
+    def update(
+        self, requests_per_minute: float, tokens_per_minute: Optional[float] = None
+    ) -> None:
+        """Change the limits without refilling the buckets."""
+        self.requests.set_rate(requests_per_minute)
+        if tokens_per_minute is None:
+            self.tokens = None
+        elif self.tokens is None:
+            self.tokens = TokenBucket(tokens_per_minute)
+        else:
+            self.tokens.set_rate(tokens_per_minute)
+
+    def consume(self, tokens: int) -> None:
+        self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+
+
+class Ticket:
+    """A granted slot, used to report the real token usage afterwards."""
+
+    def __init__(self, key: str, tokens: int, priority: str, tenant: str):
+        self.key = key
+        self.tokens = tokens
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued = time.monotonic()
+        self.waited = 0.0
+        self.future: Optional[asyncio.Future] = None
+
+
+class _LoopState:
+    """Queues, pumps and wakeup events of the callers on one event loop.
+
+    Futures, tasks and events are bound to the loop they were created on, so
+    every `asyncio.run` gets its own state while the buckets stay shared.
+    """
+
+    def __init__(self):
+        # key -> priority -> tenant -> waiting tickets
+        self.queues: dict[str, dict[int, OrderedDict[str, deque]]] = {}
+        self.pumps: dict[str, asyncio.Task] = {}
+        self.wakeups: dict[str, asyncio.Event] = {}
+        self.waiting = 0
+
+    def wakeup(self, key: str) -> asyncio.Event:
+        if key not in self.wakeups:
+            self.wakeups[key] = asyncio.Event()
+        return self.wakeups[key]
+
+
+class Scheduler:
+    """Schedules calls on rate limited keys by priority and tenant.
+
+    Attributes:
+        limits: The limit of every key. Keys without a limit are not throttled.
+        max_waiting: How many calls may wait at once before new ones are rejected.
+    """
+
+    def __init__(self, max_waiting: int = 1000):
+        self.limits: dict[str, Limit] = {}
+        self.max_waiting = max_waiting
+        self._states: dict[asyncio.AbstractEventLoop, _LoopState] = {}
+        self.stats: dict[str, dict[str, float]] = {}
+
+    def set_limit(
+        self,
+        key: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """Set the request and token limits of a key.
+
+        Setting the limits of a key again keeps what its buckets already handed
+        out, so reconfiguring the scheduler for every request does not reset it.
+        """
+        if key in self.limits:
+            self.limits[key].update(requests_per_minute, tokens_per_minute)
+        else:
+            self.limits[key] = Limit(requests_per_minute, tokens_per_minute)
+
+    @property
+    def waiting(self) -> int:
+        """Number of calls waiting for a slot."""
+        return sum(
+            state.waiting
+            for loop, state in list(self._states.items())
+            if not loop.is_closed()
+        )
+
+    def _state(self) -> _LoopState:
+        """Return the state of the running loop, dropping the ones of closed loops."""
+        for loop in [loop for loop in self._states if loop.is_closed()]:
+            del self._states[loop]
+        loop = asyncio.get_running_loop()
+        if loop not in self._states:
+            self._states[loop] = _LoopState()
+        return self._states[loop]
+
+    async def acquire(
+        self,
+        key: str,
+        tokens: int = 1,
+        priority: Optional[str] = None,
+        tenant: Optional[str] = None,
+    ) -> Ticket:
+        """Wait until a call on `key` may run.
+
+        Args:
+            key (str): The model or tool key, ie "model:gpt-4.1-mini".
+            tokens (int): Estimated tokens of the call.
+            priority (str, optional): Priority class, defaults to the current one.
+            tenant (str, optional): Tenant of the call, defaults to the current one.
+
+        Returns:
+            Ticket: The granted slot.
+
+        Raises:
+            SchedulerOverloaded: If too many calls are already waiting.
+        """
+        ticket = Ticket(
+            key,
+            tokens,
+            priority or current_priority.get(),
+            tenant or current_tenant.get(),
+        )
+        stats = self.stats.setdefault(
+            key, {"calls": 0, "rejected": 0, "waited": 0.0, "tokens": 0}
+        )
+        if key not in self.limits:
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            return ticket
+        waiting = self.waiting
+        if waiting >= self.max_waiting:
+            stats["rejected"] += 1
+            raise SchedulerOverloaded(
+                f"{waiting} calls already waiting, rejecting call on {key}"
+            )
+
+        state = self._state()
+        ticket.future = asyncio.get_running_loop().create_future()
+        level = PRIORITIES.get(ticket.priority, max(PRIORITIES.values()))
+        tenants = state.queues.setdefault(key, {}).setdefault(level, OrderedDict())
+        tenants.setdefault(ticket.tenant, deque()).append(ticket)
+        state.waiting += 1
+        state.wakeup(key).set()
+        if key not in state.pumps or state.pumps[key].done():
+            state.pumps[key] = asyncio.create_task(self._pump(state, key))
+
+        try:
+            await ticket.future
+        finally:
+            if not ticket.future.done():
+                ticket.future.cancel()
+            if ticket.future.cancelled():
+                # cancelled while waiting, leave the queue now instead of when
+                # the pump gets to the ticket so it stops counting as waiting
+                self._remove(state, ticket)
+                state.wakeup(key).set()
+        ticket.waited = time.monotonic() - ticket.enqueued
+        stats["calls"] += 1
+        stats["waited"] += ticket.waited
+        stats["tokens"] += tokens
+        return ticket
+
+    def record_usage(self, ticket: Ticket, tokens: int) -> None:
+        """Correct the token bucket of a call once its real usage is known."""
+        limit = self.limits.get(ticket.key)
+        if limit is not None and limit.tokens is not None:
+            limit.tokens.consume(tokens - ticket.tokens)
+        if ticket.key in self.stats:
+            self.stats[ticket.key]["tokens"] += tokens - ticket.tokens
+        ticket.tokens = tokens
+
+    def backoff(self, key: str, seconds: float) -> None:
+        """Pause a key after the provider answered with a rate limit error."""
+        limit = self.limits.get(key)
+        if limit is not None:
+            limit.requests.pause(seconds)
+
+    def _next(self, state: _LoopState, key: str) -> Optional[Ticket]:
+        """Return the next ticket to serve without removing it."""
+        for level in sorted(state.queues.get(key, {})):
+            tenants = state.queues[key][level]
+            if tenants:
+                return next(iter(tenants.values()))[0]
+        return None
+
+    def _remove(self, state: _LoopState, ticket: Ticket) -> None:
+        """Remove a ticket cancelled by its caller from the queue."""
+        level = PRIORITIES.get(ticket.priority, max(PRIORITIES.values()))
+        tenants = state.queues.get(ticket.key, {}).get(level, {})
+        waiting = tenants.get(ticket.tenant)
+        if waiting is None or ticket not in waiting:
+            return  # already failed by the pump
+        waiting.remove(ticket)
+        state.waiting -= 1
+        if not waiting:
+            del tenants[ticket.tenant]
+
+    def _pop(self, state: _LoopState, ticket: Ticket) -> None:
+        """Remove a served ticket and move its tenant to the back of the line."""
+        level = PRIORITIES.get(ticket.priority, max(PRIORITIES.values()))
+        tenants = state.queues[ticket.key][level]
+        waiting = tenants[ticket.tenant]
+        waiting.popleft()
+        state.waiting -= 1
+        if waiting:
+            tenants.move_to_end(ticket.tenant)
+        else:
+            del tenants[ticket.tenant]
+
+    def _fail(self, state: _LoopState, key: str, error: BaseException) -> None:
+        """Fail every call waiting on `key` so callers do not hang on a dead pump."""
+        for tenants in state.queues.pop(key, {}).values():
+            for waiting in tenants.values():
+                for ticket in waiting:
+                    state.waiting -= 1
+                    if not ticket.future.done():
+                        ticket.future.set_exception(error)
+
+    async def _pump(self, state: _LoopState, key: str) -> None:
+        """Grant slots on `key` as fast as its buckets allow."""
+        try:
+            limit = self.limits[key]
+            wakeup = state.wakeup(key)
+            while True:
+                wakeup.clear()
+                ticket = self._next(state, key)
+                if ticket is None:
+                    return
+                delay = limit.delay_for(ticket.tokens)
+                if delay > 0:
+                    # wake up early if a more urgent call arrives in the meantime
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                limit.consume(ticket.tokens)
+                self._pop(state, ticket)
+                ticket.future.set_result(ticket)
+        except asyncio.CancelledError:
+            self._fail(state, key, RuntimeError(f"Scheduler pump for {key} cancelled"))
+            raise
+        except Exception as e:
+            # surfaced to every waiting caller instead of dying unnoticed
+            self._fail(state, key, e)
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process wide scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = Scheduler()
+    return _scheduler
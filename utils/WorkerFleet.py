@@ -0,0 +1,351 @@
+"""
+Coordinator/worker mode for plan execution across cores
+
+The coordinator keeps the backlog of requests and hands one to each idle worker
+over its own multiprocessing queue. Like the Scheduler, the backlog is served by
+priority class first and round robin between tenants inside a class, so
+interactive requests do not wait behind batch requests submitted before them. Each worker process holds its own Executor,
+PlannerAgent and pooled MCPClient. Workers report back on a shared event
+queue, which the coordinator uses to dispatch the next request, restart crashed
+workers, retry the request they were handling and aggregate metrics.
+"""
+
+import asyncio
+import logging
+import multiprocessing as mp
+import os
+import queue
+import signal
+import statistics
+import sys
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from utils.Scheduler import PRIORITIES
+
+logger = logging.getLogger(__name__)
+
+# sent to a worker to stop it once it is done with its request
+_STOP = None
+
+
+def _worker_main(
+    worker_id: int, inbox, events, fleet_size: int, quiet: bool = False
+) -> None:
+    """Entry point of a worker process."""
+    # the coordinator drives shutdown, ignore ctrl-c sent to the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if quiet:
+        # silence the executor prints and info logs of the worker
+        sys.stdout = open(os.devnull, "w")
+        logging.disable(logging.INFO)
+    # every worker gets an equal share of the provider limits
+    os.environ["SCHEDULER_SHARE"] = str(fleet_size)
+    # concurrent tool calls of a plan are spread over a few MCP sessions
+    os.environ.setdefault("MCP_POOL_SIZE", "4")
+    asyncio.run(_worker_loop(worker_id, inbox, events))
+
+
+async def _worker_loop(worker_id: int, inbox, events) -> None:
+    from main import create_execute_plan, initialize_agent_service
+    from utils.Scheduler import get_scheduler
+    from utils.schemas import prebuild_schemas
+
+    prebuild_schemas()
+    executor, planner, mcp_client = await initialize_agent_service()
+    events.put(("ready", worker_id, None, {}))
+    try:
+        while True:
+            request = await asyncio.to_thread(inbox.get)
+            if request is _STOP:
+                break
+            executor.reset()
+            planner.reset()
+            start = time.perf_counter()
+            ok = await create_execute_plan(
+                executor,
+                planner,
+                request["query"],
+                priority=request["priority"],
+                tenant=request["tenant"],
+            )
+            events.put(
+                (
+                    "done",
+                    worker_id,
+                    request["id"],
+                    {
+                        "ok": ok,
+                        "duration": time.perf_counter() - start,
+                        "pid": os.getpid(),
+                        "scheduler": get_scheduler().stats,
+                        "routes": planner.stats,
+                    },
+                )
+            )
+    finally:
+        await mcp_client.disconnect()
+        events.put(("stopped", worker_id, None, {}))
+
+
+class WorkerFleet:
+    """Runs plans on a fleet of worker processes.
+
+    Attributes:
+        num_workers: Number of worker processes.
+        max_attempts: How many times a request is tried when workers crash on it.
+        max_restarts: How many crashed workers are restarted before giving up.
+        quiet: Silence the prints and info logs of the workers.
+        results: Result of every finished request, by request id.
+        restarts: Number of workers restarted after a crash.
+    """
+
+    def __init__(
+        self,
+        num_workers: Optional[int] = None,
+        max_attempts: int = 2,
+        max_restarts: int = 10,
+        quiet: bool = False,
+    ):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.max_attempts = max_attempts
+        self.max_restarts = max_restarts
+        self.quiet = quiet
+        self._ctx = mp.get_context("spawn")
+        self._events = self._ctx.Queue()
+        self._workers: dict[int, mp.Process] = {}
+        self._inboxes: dict[int, mp.Queue] = {}
+        self._idle: set[int] = set()
+        # priority -> tenant -> queued requests
+        self._backlog: dict[int, OrderedDict[str, deque]] = {}
+        self._queued = 0
+        self._in_flight: dict[int, dict] = {}  # worker id -> request
+        self._attempts: dict[str, int] = {}
+        self._worker_stats: dict[int, dict] = {}
+        # latest cumulative scheduler and route stats of every worker process,
+        # by pid, so the stats of crashed processes are kept
+        self._process_stats: dict[int, dict] = {}
+        self._stopping = False
+        self._started_at = 0.0
+        self.results: dict[str, dict] = {}
+        self.restarts = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of submitted requests that are not finished yet."""
+        return self._queued + len(self._in_flight)
+
+    def start(self) -> None:
+        """Start the worker processes."""
+        self._started_at = time.perf_counter()
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+    def _spawn(self, worker_id: int) -> None:
+        self._inboxes[worker_id] = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                worker_id,
+                self._inboxes[worker_id],
+                self._events,
+                self.num_workers,
+                self.quiet,
+            ),
+            name=f"plan-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._workers[worker_id] = process
+        logger.info(f"Started worker {worker_id} (pid {process.pid})")
+
+    def submit(
+        self, query: str, priority: str = "batch", tenant: str = "default"
+    ) -> str:
+        """Queue a request for the workers.
+
+        Args:
+            query (str): The request of the user.
+            priority (str): Scheduler priority class of the request.
+            tenant (str): Tenant the request belongs to.
+
+        Returns:
+            str: The id of the request.
+        """
+        request = {
+            "id": uuid.uuid4().hex,
+            "query": query,
+            "priority": priority,
+            "tenant": tenant,
+        }
+        self._attempts[request["id"]] = 1
+        self._enqueue(request)
+        self._dispatch()
+        return request["id"]
+
+    def wait(self, timeout: Optional[float] = None) -> dict[str, dict]:
+        """Process worker events until every submitted request is finished.
+
+        Args:
+            timeout (float, optional): Give up after this many seconds.
+
+        Returns:
+            dict[str, dict]: The results by request id.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"{self.pending} requests still pending")
+            self._poll(0.5)
+        return self.results
+
+    def _enqueue(self, request: dict, retry: bool = False) -> None:
+        """Queue a request behind the others of its tenant, or in front if retried."""
+        level = PRIORITIES.get(request["priority"], max(PRIORITIES.values()))
+        tenants = self._backlog.setdefault(level, OrderedDict())
+        waiting = tenants.setdefault(request["tenant"], deque())
+        if retry:
+            waiting.appendleft(request)
+        else:
+            waiting.append(request)
+        self._queued += 1
+
+    def _next_request(self) -> dict:
+        """Pop the next request and move its tenant to the back of the line."""
+        level = min(self._backlog)
+        tenants = self._backlog[level]
+        tenant, waiting = next(iter(tenants.items()))
+        request = waiting.popleft()
+        self._queued -= 1
+        if waiting:
+            tenants.move_to_end(tenant)
+        else:
+            del tenants[tenant]
+            if not tenants:
+                del self._backlog[level]
+        return request
+
+    def _dispatch(self) -> None:
+        """Hand requests of the backlog to idle workers."""
+        while self._queued and self._idle and not self._stopping:
+            worker_id = self._idle.pop()
+            request = self._next_request()
+            self._in_flight[worker_id] = request
+            self._inboxes[worker_id].put(request)
+
+    def _poll(self, timeout: float) -> None:
+        """Handle worker events, restart crashed workers and dispatch requests."""
+        try:
+            event = self._events.get(timeout=timeout)
+            while True:
+                self._handle(*event)
+                event = self._events.get_nowait()
+        except queue.Empty:
+            pass
+        if not self._stopping:
+            self._restart_crashed()
+        self._dispatch()
+
+    def _handle(self, kind: str, worker_id: int, request_id, data: dict) -> None:
+        stats = self._worker_stats.setdefault(
+            worker_id, {"completed": 0, "failed": 0, "busy": 0.0}
+        )
+        if kind == "ready":
+            self._idle.add(worker_id)
+        elif kind == "done":
+            self._in_flight.pop(worker_id, None)
+            self._idle.add(worker_id)
+            self.results[request_id] = {
+                "ok": data["ok"],
+                "duration": data["duration"],
+                "worker": worker_id,
+            }
+            stats["completed" if data["ok"] else "failed"] += 1
+            stats["busy"] += data["duration"]
+            self._process_stats[data["pid"]] = {
+                "scheduler": data["scheduler"],
+                "routes": data["routes"],
+            }
+
+    def _restart_crashed(self) -> None:
+        for worker_id, process in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            logger.warning(
+                f"Worker {worker_id} (pid {process.pid}) died with exit code {process.exitcode}"
+            )
+            self._idle.discard(worker_id)
+            request = self._in_flight.pop(worker_id, None)
+            if request is not None:
+                if self._attempts[request["id"]] < self.max_attempts:
+                    self._attempts[request["id"]] += 1
+                    self._enqueue(request, retry=True)
+                else:
+                    self.results[request["id"]] = {
+                        "ok": False,
+                        "duration": 0.0,
+                        "worker": worker_id,
+                        "error": "worker crashed",
+                    }
+            if self.restarts >= self.max_restarts:
+                raise RuntimeError(
+                    f"Workers crashed {self.restarts} times, giving up. Check the worker logs"
+                )
+            self.restarts += 1
+            self._spawn(worker_id)
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Let the workers finish their current request, then stop them.
+
+        Requests still in the backlog are not started.
+
+        Args:
+            timeout (float): Seconds to wait before terminating workers.
+        """
+        self._stopping = True
+        for inbox in self._inboxes.values():
+            inbox.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for worker_id, process in self._workers.items():
+            while process.is_alive() and time.monotonic() < deadline:
+                self._poll(0.1)  # keep collecting results of the last requests
+            if process.is_alive():
+                logger.warning(f"Worker {worker_id} did not stop, terminating it")
+                process.terminate()
+            process.join(timeout=1)
+
+    def metrics(self) -> dict:
+        """Aggregate the metrics of every worker.
+
+        Returns:
+            dict: Totals, latency percentiles, throughput and per worker stats.
+        """
+        from utils.Router import route_report
+
+        durations = sorted(result["duration"] for result in self.results.values())
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        scheduler: dict[str, dict] = {}
+        routes: dict[str, dict] = {}
+        for stats in self._process_stats.values():
+            for totals, name in ((scheduler, "scheduler"), (routes, "routes")):
+                for key, key_stats in stats[name].items():
+                    total = totals.setdefault(key, dict.fromkeys(key_stats, 0))
+                    for stat, value in key_stats.items():
+                        total[stat] += value
+        return {
+            "workers": self.num_workers,
+            "completed": sum(1 for r in self.results.values() if r["ok"]),
+            "failed": sum(1 for r in self.results.values() if not r["ok"]),
+            "pending": self.pending,
+            "restarts": self.restarts,
+            "throughput_per_s": len(durations) / elapsed if elapsed else 0.0,
+            "latency_p50_s": statistics.median(durations) if durations else 0.0,
+            "latency_p95_s": (
+                durations[int(0.95 * (len(durations) - 1))] if durations else 0.0
+            ),
+            "scheduler": scheduler,
+            "routes": route_report(routes),
+            "per_worker": self._worker_stats,
+        }
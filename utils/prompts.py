@@ -40,3 +40,19 @@ You will be given a output format that you MUST adhere to.
 
 Generate plans immediately without asking follow-up questions unless absolutely necessary.
 """
+
+# Define prompt for repairing the failed tasks of a plan
+REPLANNER_AGENT_PROMPT = """
+Some tasks of a plan you created failed or are incomplete.
+You will be given the original request, short summaries of the tasks that completed and the tasks that failed with their errors.
+
+REPAIR APPROACH:
+1. Return a plan that ONLY contains tasks to replace the failed or incomplete tasks.
+2. DO NOT repeat completed tasks, their results are kept and will be reused.
+3. Keep the id of a failed task for the task that replaces it.
+4. Tasks you add on top of the replacements MUST use ids greater than every id in the original plan.
+5. Fix the cause of each error, ie wrong tool name, missing or invalid arguments.
+6. For each task you MUST assign a tool to perform the task.
+
+You will be given a output format that you MUST adhere to.
+"""
@@ -1,20 +1,27 @@
-from pydantic import BaseModel, Field
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Literal
 
 
-class InitialResponse(BaseModel):
+class SchemaBase(BaseModel):
+    """Base for all schemas. Validators are built on first use, not at import."""
+
+    model_config = ConfigDict(defer_build=True)
+
+
+class InitialResponse(SchemaBase):
     next_step: str = Field(
         description="Given the user input, what is the next step we will take. ie plan",
     )
 
 
-class ToolArguments(BaseModel):
+class ToolArguments(SchemaBase):
     keys: List[str] = Field(description="A list of arguments to a tool")
     values: List[str] = Field(description="A list of argument values to a tool")
     # arguments: Dict[str, Any] = Field(description="A dictionary where keys are tool arguments and values are the tool call values")
 
 
-class ToolCall(BaseModel):
+class ToolCall(SchemaBase):
     """Represents a tool call request from the LLM."""
 
     id: str = Field(description="The ID of the tool call.")
@@ -22,14 +29,14 @@ class ToolCall(BaseModel):
     arguments: ToolArguments = Field(description="The arguments to call the tool with.")
 
 
-class ToolCalls(BaseModel):
+class ToolCalls(SchemaBase):
     id: int = Field(description="An ID for the tool calls")
     tool_calls: List[ToolCall] = Field(
         description="A list of tools to be executed sequentially."
     )
 
 
-class PlannerTask(BaseModel):
+class PlannerTask(SchemaBase):
     """Represents a single task generated by the Planner."""
 
     id: int = Field(description="Sequential ID for the task.")
@@ -55,7 +62,7 @@ class PlannerTask(BaseModel):
     ] = Field(default="input_required", description="Status of the task")
 
 
-class Plan(BaseModel):
+class Plan(SchemaBase):
     """Output schema for the Planner Agent."""
 
     original_query: str = Field(description="The original user query for context.")
@@ -65,7 +72,7 @@ class Plan(BaseModel):
     )
 
 
-class ToolResult(BaseModel):
+class ToolResult(SchemaBase):
     """Represents the result of a tool execution."""
 
     tool_call_id: str = Field(description="The ID of the tool call this result is for.")
@@ -75,7 +82,7 @@ class ToolResult(BaseModel):
     )
 
 
-class ContentResponse(BaseModel):
+class ContentResponse(SchemaBase):
     type: str = Field(
         description="The type of content such as body paragraph, introduction conclusion etc"
     )
@@ -83,26 +90,37 @@ class ContentResponse(BaseModel):
     content: str = Field(description="The content generated by the agent")
 
 
-class AssembledResponse(BaseModel):
+class AssembledResponse(SchemaBase):
     """Represents the result of a tool execution."""
 
     content: str = Field(description="The assembled response.")
 
 
-class ReviewResponse(BaseModel):
+class ReviewResponse(SchemaBase):
     """Represents the result of a tool execution."""
 
     thought: str = Field(description="What stood out to change or not change")
     content: str = Field(description="The assembled response.")
 
 
-class WriteResponse(BaseModel):
+class WriteResponse(SchemaBase):
     """Represents the result of a tool execution."""
 
     content: str = Field(description="The assembled response.")
 
 
-class FinalResponse(BaseModel):
+class FinalResponse(SchemaBase):
     """Represents the result of a tool execution."""
 
     content: str = Field(description="The Fully assembled response.")
+
+
+@lru_cache(maxsize=None)
+def prebuild_schemas() -> None:
+    """Build the validators of the planner schemas ahead of time.
+
+    Long lived workers call this once at startup so the first plan does not
+    pay for schema construction. Short CLI runs can skip it.
+    """
+    for model in (ToolArguments, ToolCall, PlannerTask, Plan):
+        model.model_rebuild(force=True)